@@ -1,15 +1,20 @@
 import time
-import datetime
-import json
+import asyncio
+import contextlib
 import math
-import re
+import hashlib
+import threading
 import requests
+import aiohttp
+import orjson
+import diskcache
 import pandas as pd
 import numpy as np
 import streamlit as st
 import googlemaps
 from urllib.parse import urlparse
-from geopy.distance import geodesic
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import folium
 from folium.plugins import HeatMap
 from streamlit_folium import st_folium
@@ -17,26 +22,152 @@ import plotly.graph_objects as go
 from bs4 import BeautifulSoup
 
 # --- HTTP retry session ---
+# Shared by the blocking worker threads, so keep one pooled connection per thread
+BLOCKING_WORKERS = 16
 session = requests.Session()
 from requests.adapters import HTTPAdapter, Retry
 retries = Retry(total=3, backoff_factor=1, status_forcelist=[429,500,502,503,504])
-session.mount('https://', HTTPAdapter(max_retries=retries))
+session.mount('https://', HTTPAdapter(pool_maxsize=BLOCKING_WORKERS, max_retries=retries))
+
+# --- Persistent API cache ---
+# Survives app restarts; API keys only ever appear hashed in cache keys
+@st.cache_resource(show_spinner=False)
+def api_cache():
+    """One SQLite-backed cache handle for the process, reused across reruns and sessions"""
+    return diskcache.Cache('./.geogrid_cache', size_limit=2**30)
+
+disk_cache = api_cache()
+GEO_CACHE_TTL = 7*86400
+RANK_CACHE_TTL = 86400
+
+def key_id(api_key):
+    return hashlib.blake2b((api_key or '').encode(), digest_size=8).hexdigest()
+
+def disk_cached(key, compute, expire):
+    """Return the cached value for key, computing and storing it on a miss; None is never stored,
+    so compute must raise (or return None) on failure rather than return an empty result"""
+    value = disk_cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            disk_cache.set(key, value, expire=expire)
+    return value
+
+# --- Async SERP transport ---
+SERP_CONCURRENCY = 32
+SERP_RATE_PER_SEC = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_DELAY = 60  # Cap on Retry-After, which pauses the provider's whole bucket
+
+class RateLimiter:
+    """Async token bucket and concurrency cap for one API; a Retry-After pause holds back every caller"""
+    def __init__(self, rate, concurrency, per=1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self):
+        # Take a slot before a token so queued callers don't drain the bucket
+        await self._slots.acquire()
+        try:
+            await self.acquire()
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._slots.release()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+def _retry_delay(retry_after, attempt):
+    """Seconds to wait before retrying, preferring the server's Retry-After hint"""
+    try:
+        return min(max(float(retry_after), 0), MAX_RETRY_DELAY)
+    except (TypeError, ValueError):
+        return 2 ** attempt
+
+async def fetch_with_backoff(http, method, url, retries=3, limiter=None, **kwargs):
+    """Issue a request on the shared aiohttp session, backing off on 429/5xx and
+    connection errors or timeouts; returns the raw body"""
+    for attempt in range(retries + 1):
+        try:
+            async with limiter or contextlib.nullcontext():
+                async with http.request(method, url, **kwargs) as resp:
+                    if resp.status not in RETRY_STATUSES or attempt == retries:
+                        resp.raise_for_status()
+                        return await resp.read()
+                    retry_after = resp.headers.get('Retry-After')
+                    delay = _retry_delay(retry_after, attempt)
+                    # Only a 429 or an explicit Retry-After speaks for the whole provider; a bare
+                    # 5xx is often one failed scrape (ScraperAPI), so only that caller backs off
+                    throttled = resp.status == 429 or retry_after is not None
+        except aiohttp.ClientResponseError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            # A dropped connection says nothing about the provider's rate, so only this caller waits
+            await asyncio.sleep(2 ** attempt)
+            continue
+        if limiter and throttled:
+            limiter.pause(delay)
+        else:
+            await asyncio.sleep(delay)
+
+# --- Blocking client offload ---
+@st.cache_resource(show_spinner=False)
+def worker_pool(name, max_workers):
+    """A named thread pool built once per process, so reruns and sessions share its workers"""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+_executor = worker_pool('blocking', BLOCKING_WORKERS)
+# Geocoding gets its own pool: Places jobs can run for seconds (page-token sleeps), and
+# queued behind them, the reverse geocodes that gate every SERP lookup would wait too
+_geo_executor = worker_pool('geocode', 8)
+
+def run_blocking(fn, *args, pool=_executor, **kwargs):
+    """Run a blocking client call on a worker pool without stalling the event loop"""
+    ctx = get_script_run_ctx()
+    def call():
+        # Keep st.error() calls from worker threads attached to the user's session
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    return asyncio.get_running_loop().run_in_executor(pool, call)
 
 # --- Serpstack & ScraperAPI helpers ---
-def serpstack_location_api(api_key, city_query):
+async def serpstack_location_api(http, api_key, city_query, limiter=None):
     url = 'https://api.serpstack.com/locations'
     params = {'access_key': api_key, 'query': city_query, 'limit': 1}
     try:
-        r = session.get(url, params=params, timeout=30)
-        r.raise_for_status()
-        data = r.json()
+        data = orjson.loads(await fetch_with_backoff(http, 'GET', url, params=params, limiter=limiter))
         if isinstance(data, list) and data:
             return data[0].get('canonical_name')
     except Exception as e:
         st.error(f"Location API error: {str(e)}")
     return None
 
-def scraper_api_search(api_key, query, location, domain):
+async def scraper_api_search(http, api_key, query, location, domain, limiter=None):
     """Use ScraperAPI with specific parameters to get SERP data"""
     url = 'https://api.scraperapi.com/scrape'
     
@@ -59,9 +190,8 @@ def scraper_api_search(api_key, query, location, domain):
         payload['location'] = location
     
     try:
-        response = session.post(url, json=payload, timeout=60)
-        response.raise_for_status()
-        return response.text
+        return await fetch_with_backoff(http, 'POST', url, json=payload, limiter=limiter,
+                                        timeout=aiohttp.ClientTimeout(total=60))
     except Exception as e:
         st.error(f"ScraperAPI error: {str(e)}")
         return None
@@ -77,8 +207,8 @@ def parse_serp_results(html_content, business_name, domain):
         'organic': None
     }
     
-    # Convert to lowercase for case-insensitive matching
-    business_name_lower = business_name.lower()
+    # Case-fold the needle once rather than per listing
+    needle = business_name.casefold()
     domain_lower = domain.lower()
     
     # 1. Find local pack results (multiple possible class names)
@@ -101,8 +231,7 @@ def parse_serp_results(html_content, business_name, domain):
         possible_listings.extend(local_pack.find_all('div', {'class': 'cXedhc'}))
         
         for idx, listing in enumerate(possible_listings, 1):
-            text_content = listing.get_text().lower()
-            if business_name_lower in text_content:
+            if needle in listing.get_text().casefold():
                 results['local_pack'] = idx
                 break
     
@@ -112,33 +241,29 @@ def parse_serp_results(html_content, business_name, domain):
     organic_results.extend(soup.find_all('div', {'class': 'tF2Cxc'}))
     organic_results.extend(soup.find_all('div', {'class': 'yuRUbf'}))
     
-    # Deduplicate results
+    # Deduplicate results and find the business in the same pass, stopping at the first match
     seen_urls = set()
-    unique_organic_results = []
+    idx = 0
     for result in organic_results:
         link = result.find('a')
-        if link and link.get('href'):
-            url = link.get('href')
-            if url not in seen_urls:
-                seen_urls.add(url)
-                unique_organic_results.append(result)
-    
-    # Find the business in organic results
-    for idx, result in enumerate(unique_organic_results, 1):
-        link = result.find('a')
-        if link and link.get('href'):
-            url = link.get('href').lower()
-            title = result.find('h3')
-            title_text = title.get_text().lower() if title else ""
-            
-            # Check for domain match or business name in title
-            if domain_lower in url or business_name_lower in title_text:
-                results['organic'] = idx
-                break
+        if not (link and link.get('href')):
+            continue
+        url = link.get('href')
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        idx += 1
+        
+        title = result.find('h3')
+        
+        # Check for domain match or business name in title
+        if domain_lower in url.lower() or (title and needle in title.get_text().casefold()):
+            results['organic'] = idx
+            break
     
     return results['local_pack'], results['organic']
 
-def serpstack_search(api_key, query, location_name):
+async def serpstack_search(http, api_key, query, location_name, limiter=None):
     """Original Serpstack search function"""
     url = 'https://api.serpstack.com/search'
     params = {
@@ -152,9 +277,7 @@ def serpstack_search(api_key, query, location_name):
         'auto_location': 0
     }
     try:
-        r = session.get(url, params=params, timeout=30)
-        r.raise_for_status()
-        data = r.json()
+        data = orjson.loads(await fetch_with_backoff(http, 'GET', url, params=params, limiter=limiter))
         if data.get('success', True):
             return data
     except Exception as e:
@@ -162,35 +285,54 @@ def serpstack_search(api_key, query, location_name):
     return {}
 
 # --- Google Places helpers ---
-def google_places_fetch(lat, lon, keyword, api_key):
+def _places_page(base, params):
+    r = session.get(base, params=params, timeout=30)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+def _places_nearby_fetch(lat_bucket, lng_bucket, keyword, api_key):
+    """Nearby Search results for a ~100 m location bucket, best-rated first"""
     base = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
-    params = {'location': f"{lat},{lon}", 'keyword': keyword, 'rankby': 'distance', 'key': api_key}
+    params = {'location': f"{lat_bucket},{lng_bucket}", 'keyword': keyword, 'rankby': 'distance', 'key': api_key}
     all_results = []
     
-    try:
-        for _ in range(3):
-            r = session.get(base, params=params, timeout=30)
-            if not r.ok: 
-                st.error(f"Google Places API error: {r.status_code}")
-                break
-            data = r.json()
-            all_results.extend(data.get('results', []))
-            token = data.get('next_page_token')
-            if not token: break
+    for _ in range(3):
+        data = _places_page(base, params)
+        if data.get('status') == 'INVALID_REQUEST' and 'pagetoken' in params:
+            # Page tokens take a moment to become valid; give an early one a second try
             time.sleep(2)
-            params['pagetoken'] = token
-            
-        structured = []
-        for p in all_results:
-            structured.append({
-                'place_id': p.get('place_id'),
-                'name': p.get('name','').lower(),
-                'rating': float(p.get('rating') or 0),
-                'reviews': int(p.get('user_ratings_total') or 0),
-                'vicinity': p.get('vicinity', '')
-            })
-        structured.sort(key=lambda x: (-x['rating'], -x['reviews'], x['name']))
-        return structured
+            data = _places_page(base, params)
+        # Quota and auth failures arrive as HTTP 200; raise so they are never cached
+        if data.get('status') not in ('OK', 'ZERO_RESULTS'):
+            raise RuntimeError(f"Places API returned {data.get('status')}: {data.get('error_message', '')}")
+        all_results.extend(data.get('results', []))
+        token = data.get('next_page_token')
+        if not token: break
+        time.sleep(2)
+        params['pagetoken'] = token
+        
+    structured = []
+    for p in all_results:
+        structured.append({
+            'place_id': p.get('place_id'),
+            'name': p.get('name','').casefold(),
+            'rating': float(p.get('rating') or 0),
+            'reviews': int(p.get('user_ratings_total') or 0),
+            'vicinity': p.get('vicinity', '')
+        })
+    structured.sort(key=lambda x: (-x['rating'], -x['reviews'], x['name']))
+    return structured
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _places_nearby_cached(lat_bucket, lng_bucket, keyword, api_key):
+    return disk_cached(('places', key_id(api_key), lat_bucket, lng_bucket, keyword),
+                       lambda: _places_nearby_fetch(lat_bucket, lng_bucket, keyword, api_key),
+                       RANK_CACHE_TTL)
+
+def google_places_fetch(lat, lon, keyword, api_key):
+    # Round to 3 decimals so input jitter and re-scans reuse the cached lookup
+    try:
+        return _places_nearby_cached(round(lat, 3), round(lon, 3), keyword, api_key)
     except Exception as e:
         st.error(f"Google Places fetch error: {str(e)}")
         return []
@@ -198,10 +340,10 @@ def google_places_fetch(lat, lon, keyword, api_key):
 def google_places_rank(lat, lon, business_name, domain, api_key):
     spots = google_places_fetch(lat, lon, business_name, api_key)
     map_rank = None
-    business_name_lower = business_name.lower()
+    needle = business_name.casefold()
     
     for idx, item in enumerate(spots, start=1):
-        if business_name_lower in item['name']:
+        if needle in item['name']:
             map_rank = idx
             break
     
@@ -213,25 +355,27 @@ def _build_colormap():
     return LinearColormap(['red','orange','green'], vmin=0, vmax=1)
 
 # --- Plotly scattermap ---
+# Rank columns in scan results, in display order
+RANK_COLS = ['org_rank', 'lp_rank', 'gmp_rank']
+
+# Marker colour by rank: index 0 is unranked, 1-3 green, 4-10 orange, 11 and beyond red
+RANK_COLORS = np.array(['gray'] + ['green']*3 + ['orange']*7 + ['red'])
+
 def create_scattermap(df, center_lat, center_lon, rank_col, title):
-    fig = go.Figure()
-    for _, row in df.iterrows():
-        r = row.get(rank_col)
-        if pd.isna(r) or r is None:
-            color, text = 'gray','X'
-        else:
-            r = int(r)
-            if r <= 3: color='green'
-            elif r <= 10: color='orange'
-            else: color='red'
-            text = str(r)
-        fig.add_trace(go.Scattermapbox(
-            lat=[row['lat']], lon=[row['lng']], mode='markers+text',
-            marker=dict(size=20, color=color), text=[text], textposition='middle center',
-            textfont=dict(size=14, color='white'), hoverinfo='text',
-            hovertext=f"Keyword: {row['keyword']}<br>Rank: {text}<br>Dist: {row['dist_km']:.2f}km",
-            showlegend=False
-        ))
+    rank = df[rank_col].to_numpy(dtype=np.float64)
+    ranked = ~np.isnan(rank)
+    colors = RANK_COLORS[np.where(ranked, np.minimum(np.nan_to_num(rank), 11), 0).astype(np.intp)]
+    texts = pd.Series(np.where(ranked, np.nan_to_num(rank).astype(int).astype(str), 'X'), index=df.index)
+    hovers = ("Keyword: " + df['keyword'].astype(str) + "<br>Rank: " + texts
+              + "<br>Dist: " + df['dist_km'].map('{:.2f}km'.format))
+    
+    # One trace for the whole grid instead of one per point
+    fig = go.Figure(go.Scattermapbox(
+        lat=df['lat'], lon=df['lng'], mode='markers+text',
+        marker=dict(size=20, color=colors), text=texts, textposition='middle center',
+        textfont=dict(size=14, color='white'), hoverinfo='text',
+        hovertext=hovers, showlegend=False
+    ))
     fig.update_layout(
         mapbox_style='open-street-map',
         mapbox_center={'lat': center_lat, 'lon': center_lon},
@@ -247,18 +391,14 @@ def create_organic_heatmap(data, center_lat, center_lng):
                         tiles='CartoDB positron')
     
     # Process heat data with better weighting
-    heat_data = []
-    for d in data:
-        rank = d.get('org_rank')
-        # Use inverse of rank as weight (higher for better positions)
-        if rank and rank <= 10:
-            # Weight: 10 for position 1, 9 for position 2, etc.
-            weight = 11 - rank
-            heat_data.append([d['lat'], d['lng'], weight])
-        elif rank and rank <= 20:
-            # Lower weight for positions 11-20
-            weight = (21 - rank) / 2
-            heat_data.append([d['lat'], d['lng'], weight])
+    rank = data['org_rank'].to_numpy(dtype=np.float64)
+    # Use inverse of rank as weight (higher for better positions):
+    # 10 for position 1, 9 for position 2, etc., and half weight for positions 11-20
+    weight = np.where(rank <= 10, 11 - rank, (21 - rank) / 2)
+    keep = rank <= 20  # Unranked (NaN) points drop out here
+    heat_data = np.column_stack([data['lat'].to_numpy()[keep],
+                                 data['lng'].to_numpy()[keep],
+                                 weight[keep]]).tolist()
     
     # Only add heatmap if we have data
     if heat_data:
@@ -274,102 +414,246 @@ def create_organic_heatmap(data, center_lat, center_lng):
     
     return folmap
 
+# --- Cached map builders ---
+def results_hash(df):
+    """Short content hash of a results frame, used to key cached renders"""
+    return hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).values.tobytes(),
+                           digest_size=8).hexdigest()
+
+@st.cache_resource(max_entries=12, show_spinner=False)
+def cached_scattermap(data_hash, _df, center_lat, center_lon, rank_col, title):
+    """create_scattermap memoized per scan; _df is identified by data_hash"""
+    return create_scattermap(_df, center_lat, center_lon, rank_col, title)
+
+@st.cache_resource(max_entries=12, show_spinner=False)
+def cached_organic_heatmap(data_hash, _df, center_lat, center_lng):
+    """create_organic_heatmap memoized per scan; _df is identified by data_hash"""
+    return create_organic_heatmap(_df, center_lat, center_lng)
+
+# --- Export payloads ---
+@st.cache_data(max_entries=12, show_spinner=False)
+def csv_bytes(data_hash, _df):
+    return _df.to_csv(index=False).encode()
+
+@st.cache_data(max_entries=12, show_spinner=False)
+def json_bytes(data_hash, _df):
+    # Integer ranks and null for unranked, as in the original export; orjson writes
+    # floats in shortest round-trip form, so coordinates keep full precision
+    records = _df.astype({col: 'Int16' for col in RANK_COLS}).astype(object)
+    return orjson.dumps(records.where(records.notna(), None).to_dict('records'))
+
+@st.cache_data(max_entries=12, show_spinner=False)
+def parquet_bytes(data_hash, _df):
+    """Typed, compressed export that keeps NaN ranks and the categorical keyword intact"""
+    return _df.to_parquet(index=False)
+
+# --- Visibility summary ---
+def summarize_visibility(df):
+    """Coverage and top-3 share per rank column, computed in one pass over the ranks"""
+    ranks = df[RANK_COLS].to_numpy(dtype=np.float64)
+    if len(ranks):
+        pct = (~np.isnan(ranks)).mean(axis=0)*100
+        top3 = (ranks <= 3).mean(axis=0)*100
+    else:
+        pct = top3 = np.zeros(len(RANK_COLS))
+    
+    summary = {'total': len(df)}
+    for col, p, t in zip(RANK_COLS, pct, top3):
+        prefix = col.split('_')[0]
+        summary[f'{prefix}_pct'] = float(p)
+        summary[f'{prefix}_top3'] = float(t)
+    return summary
+
 # --- Competitor Analysis ---
-def analyze_competitors(all_competitors):
-    """Analyze top competitors from Google Places data"""
-    if not all_competitors:
-        return pd.DataFrame()
-    
-    # Flatten the list of lists
-    all_spots = []
-    for competitors in all_competitors:
-        if competitors:
-            all_spots.extend(competitors)
-    
-    if not all_spots:
+def analyze_competitors(competitors):
+    """Analyze top competitors from the per-point Google Places table"""
+    if competitors.empty:
         return pd.DataFrame()
     
     # Count occurrences of each business
-    business_counts = {}
-    for spot in all_spots:
-        name = spot['name']
-        if name in business_counts:
-            business_counts[name]['count'] += 1
-            business_counts[name]['avg_rating'] = (business_counts[name]['avg_rating'] * 
-                                                  (business_counts[name]['count']-1) + 
-                                                  spot['rating']) / business_counts[name]['count']
-            business_counts[name]['total_reviews'] += spot['reviews']
-        else:
-            business_counts[name] = {
-                'count': 1,
-                'avg_rating': spot['rating'],
-                'total_reviews': spot['reviews'],
-                'vicinity': spot['vicinity']
-            }
-    
-    # Convert to DataFrame
-    df_competitors = pd.DataFrame([
-        {
-            'business_name': name,
-            'appearance_count': data['count'],
-            'avg_rating': round(data['avg_rating'], 1),
-            'total_reviews': data['total_reviews'],
-            'address': data['vicinity']
-        }
-        for name, data in business_counts.items()
-    ])
+    df_competitors = competitors.groupby('name', sort=False).agg(
+        appearance_count=('name', 'size'),
+        avg_rating=('rating', 'mean'),
+        total_reviews=('reviews', 'sum'),
+        address=('vicinity', 'first')
+    ).rename_axis('business_name').reset_index()
+    df_competitors['avg_rating'] = df_competitors['avg_rating'].round(1)
     
     # Sort by appearance count
-    df_competitors = df_competitors.sort_values('appearance_count', ascending=False).reset_index(drop=True)
+    df_competitors = df_competitors.sort_values('appearance_count', ascending=False, kind='stable').reset_index(drop=True)
     return df_competitors
 
+# --- Google Maps client ---
+@st.cache_resource(show_spinner=False)
+def gmaps_client(gmaps_key):
+    """One googlemaps client (and its pooled HTTP session) per key, reused across reruns"""
+    return googlemaps.Client(key=gmaps_key)
+
+# --- Geocode cache ---
+@st.cache_data(ttl=86400, show_spinner=False)
+def _geocode_cached(_gmaps, gmaps_key, address):
+    """Geocode once per (API key, normalized address); survives Streamlit reruns and restarts"""
+    def lookup():
+        res = _gmaps.geocode(address)
+        return res[0]['geometry']['location'] if res else None
+    return disk_cached(('geocode', key_id(gmaps_key), address), lookup, GEO_CACHE_TTL)
+
+# --- Grid geometry ---
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cells per side of the block that shares one Places lookup when merging
+PLACES_MERGE = 2
+
 # --- GeoGridTracker ---
 class GeoGridTracker:
     def __init__(self, serp_key, gmaps_key, scraper_key=None):
         self.serpkey = serp_key
         self.gmaps_key = gmaps_key
         self.scraper_key = scraper_key
-        self.gmaps = googlemaps.Client(key=gmaps_key)
+        self.gmaps = gmaps_client(gmaps_key)
         self.results = []
         self.competitors = []
+        self.center = None
+        self._lookups = {}
+        self._limits = {}
+        self._refresh = False
 
     def geocode(self, addr):
         try:
-            res = self.gmaps.geocode(addr)
-            return res[0]['geometry']['location'] if res else None
+            return _geocode_cached(self.gmaps, self.gmaps_key, " ".join(addr.lower().split()))
         except Exception as e:
             st.error(f"Geocoding error: {str(e)}")
             return None
 
+    def _reverse_city_lookup(self, lat, lng):
+        resp = self.gmaps.reverse_geocode((lat,lng), result_type=['locality','administrative_area_level_1'])
+        for comp in resp[0]['address_components']:
+            if 'locality' in comp['types'] or 'administrative_area_level_1' in comp['types']:
+                return comp['long_name']
+        return None
+
     def reverse_city(self, lat, lng):
+        # Grid points ~100 m apart share a city, so the lookup is cached per 3-decimal cell
+        lat, lng = round(lat, 3), round(lng, 3)
         try:
-            resp = self.gmaps.reverse_geocode((lat,lng), result_type=['locality','administrative_area_level_1'])
-            for comp in resp[0]['address_components']:
-                if 'locality' in comp['types'] or 'administrative_area_level_1' in comp['types']:
-                    return comp['long_name']
-            return None
+            return disk_cached(('city', key_id(self.gmaps_key), lat, lng),
+                               lambda: self._reverse_city_lookup(lat, lng), GEO_CACHE_TTL)
         except Exception as e:
             st.error(f"Reverse geocoding error: {str(e)}")
             return None
 
     def gen_grid(self, lat0, lng0, radius, step, shape):
-        pts=[]
+        """Grid point latitudes, longitudes, distances from the center (km) and row/column
+        indices as parallel arrays"""
+        cos_lat0 = math.cos(math.radians(lat0))
         lat_deg = radius/111.0
-        lng_deg = radius/(111.0*math.cos(math.radians(lat0)))
-        rows = int(2*lat_deg/(step/111.0))+1
-        cols = int(2*lng_deg/(step/111.0))+1
-        for i in range(rows):
-            for j in range(cols):
-                lat = lat0 - lat_deg + (i*2*lat_deg/(rows-1) if rows>1 else 0)
-                lng = lng0 - lng_deg + (j*2*lng_deg/(cols-1) if cols>1 else 0)
-                d = geodesic((lat0,lng0),(lat,lng)).km
-                if shape=='Circle' and d>radius: continue
-                pts.append({'lat':lat,'lng':lng,'dist_km':d})
-        return pts
-
-    def run_scan(self, business, website, radius, step, shape, progress=None):
-        center = self.geocode(business)
-        if not center: return []
+        lng_deg = radius/(111.0*cos_lat0)
+        # Same count on both axes keeps east-west spacing at `step` km; rounding first stops
+        # float error (e.g. 2*0.7/0.1 == 13.999...) from dropping a row
+        steps = int(round(2*radius/step, 6))+1
+        lats = np.linspace(lat0-lat_deg, lat0+lat_deg, steps)
+        lngs = np.linspace(lng0-lng_deg, lng0+lng_deg, steps)
+        # Haversine distance from the center; its terms separate by axis, so the
+        # trig runs on rows+cols values and only sqrt/arcsin touch the full grid
+        sin2_dlat = np.sin(np.radians(lats-lat0)/2)**2
+        sin2_dlng = np.sin(np.radians(lngs-lng0)/2)**2
+        cos_term = cos_lat0*np.cos(np.radians(lats))
+        d = 2*EARTH_RADIUS_KM*np.arcsin(np.sqrt(sin2_dlat[:, None] + cos_term[:, None]*sin2_dlng))
+        if shape=='Circle':
+            i, j = np.nonzero(d <= radius)
+        else:
+            i, j = np.indices(d.shape).reshape(2, -1)
+        return lats[i], lngs[j], d[i, j], i, j
+
+    def run_scan(self, business, website, radius, step, shape, progress=None, merge_places=False,
+                 serp_rate=SERP_RATE_PER_SEC, serp_concurrency=SERP_CONCURRENCY, refresh=False):
+        return asyncio.run(self._run_scan_async(business, website, radius, step, shape, progress, merge_places,
+                                                serp_rate, serp_concurrency, refresh))
+
+    def places_anchors(self, lats, lngs, rows, cols):
+        """Group points into PLACES_MERGE x PLACES_MERGE blocks of grid indices, so each block
+        shares one Places lookup at the centroid of its points"""
+        # Integer indices keep blocks exact; snapping coordinates hit half-cell ties
+        _, block = np.unique(np.column_stack([rows//PLACES_MERGE, cols//PLACES_MERGE]),
+                             axis=0, return_inverse=True)
+        block = block.ravel()
+        size = np.bincount(block)
+        return (np.bincount(block, lats)/size)[block], (np.bincount(block, lngs)/size)[block]
+
+    def _shared(self, key, make_coro):
+        """One in-flight lookup per distinct query within a scan, awaited by every point that needs it"""
+        if key not in self._lookups:
+            self._lookups[key] = asyncio.ensure_future(make_coro())
+        return self._lookups[key]
+
+    async def _location_lookup(self, http, city):
+        key = ('location', key_id(self.serpkey), city)
+        locn = disk_cache.get(key)
+        if locn is None:
+            locn = await serpstack_location_api(http, self.serpkey, city, self._limits['serpstack'])
+            if locn is not None:
+                disk_cache.set(key, locn, expire=GEO_CACHE_TTL)
+        return locn
+
+    async def _serp_lookup(self, http, business, domain, needle, location_str):
+        """Local pack and organic ranks for one search location"""
+        key = ('serp', key_id(self.scraper_key), key_id(self.serpkey), business, domain, location_str)
+        cached = None if self._refresh else disk_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        answered = False  # Only cache ranks that came from a successful SERP response
+        # Attempt SERP results with ScraperAPI first
+        lp, org = None, None
+        if self.scraper_key:
+            html_content = await scraper_api_search(http, self.scraper_key, business, location_str, domain,
+                                                    self._limits['scraperapi'])
+            lp, org = parse_serp_results(html_content, business, domain)
+            answered = html_content is not None
+        
+        # Fallback to SerpStack if needed
+        if (lp is None or org is None) and self.serpkey:
+            serp = await serpstack_search(http, self.serpkey, business, location_str, self._limits['serpstack'])
+            answered = answered or bool(serp)
+            if org is None:
+                org = next((i for i, r in enumerate(serp.get('organic_results', []), 1)
+                            if domain in r.get('url','').lower() or needle in r.get('title','').casefold()), None)
+            if lp is None:
+                lp = next((i for i, r in enumerate(serp.get('local_results', []), 1)
+                           if needle in r.get('title','').casefold()), None)
+    
+        if answered:
+            disk_cache.set(key, (lp, org), expire=RANK_CACHE_TTL)
+        return lp, org
+
+    async def _serp_ranks(self, http, lat, lng, business, domain, needle):
+        """Local pack and organic ranks for a grid point, plus the location used"""
+        city = await run_blocking(self.reverse_city, lat, lng, pool=_geo_executor) or ''
+        
+        # The SERP query only depends on the resolved location, and neighbouring
+        # points share a city, so each distinct location is searched once per scan
+        locn = await self._shared(('location', city), lambda: self._location_lookup(http, city))
+        location_str = locn or city
+        lp, org = await self._shared(('serp', location_str), lambda: self._serp_lookup(
+            http, business, domain, needle, location_str))
+        
+        return lp, org, location_str
+
+    async def _scan_point(self, http, lat, lng, places_at, business, domain, needle):
+        """Fetch SERP and Maps rankings for a single grid point"""
+        # Places runs on the thread pool while the SERP requests are in flight;
+        # points that share a Places location share the lookup
+        places = self._shared(('places',) + places_at, lambda: run_blocking(
+            google_places_rank, *places_at, business, domain, self.gmaps_key))
+        (lp, org, location_str), (gmp, top_competitors) = await asyncio.gather(
+            self._serp_ranks(http, lat, lng, business, domain, needle), places)
+        
+        return lp, org, gmp, location_str, top_competitors
+
+    async def _run_scan_async(self, business, website, radius, step, shape, progress=None, merge_places=False,
+                              serp_rate=SERP_RATE_PER_SEC, serp_concurrency=SERP_CONCURRENCY, refresh=False):
+        center = self.center = await run_blocking(self.geocode, business, pool=_geo_executor)
+        if not center: return pd.DataFrame()
     
         # Normalize domain format
         domain = urlparse(website).netloc.lower()
@@ -380,57 +664,77 @@ class GeoGridTracker:
             if not (domain.startswith('http://') or domain.startswith('https://')):
                 domain = domain.split('/')[0]  # Get just the domain part
     
-        grid = self.gen_grid(center['lat'], center['lng'], radius, step, shape)
-        total = len(grid)
-        out = []
-        all_competitors = []
-    
-        for idx, pt in enumerate(grid, start=1):
-            if progress: progress.progress(idx/total)
-            city = self.reverse_city(pt['lat'], pt['lng']) or ''
-            
-            # Get location for search
-            locn = serpstack_location_api(self.serpkey, city)
-            location_str = locn or city
-            
-            # Attempt SERP results with ScraperAPI first
-            lp, org = None, None
-            if self.scraper_key:
-                html_content = scraper_api_search(self.scraper_key, business, location_str, domain)
-                lp, org = parse_serp_results(html_content, business, domain)
-            
-            # Fallback to SerpStack if needed
-            if (lp is None or org is None) and self.serpkey:
-                serp = serpstack_search(self.serpkey, business, location_str)
-                if org is None:
-                    org = next((i for i, r in enumerate(serp.get('organic_results', []),1)
-                            if domain in r.get('url','').lower() or business.lower() in r.get('title','').lower()), None)
-                if lp is None:
-                    lp = next((i for i, r in enumerate(serp.get('local_results', []),1)
-                           if business.lower() in r.get('title','').lower()), None)
-            
-            # Get Google Maps ranking
-            gmp, top_competitors = google_places_rank(pt['lat'], pt['lng'], business, domain, self.gmaps_key)
-            all_competitors.append(top_competitors)
-            
-            out.append({
-                'keyword': business,
-                'lat': pt['lat'],
-                'lng': pt['lng'],
-                'dist_km': pt['dist_km'],
-                'org_rank': org,
-                'lp_rank': lp,
-                'gmp_rank': gmp,
-                'location': location_str
-            })
-            
-            # Throttle requests
-            time.sleep(2)  # Increased wait time to avoid rate limits
+        lat_arr, lng_arr, dist_arr, rows, cols = self.gen_grid(center['lat'], center['lng'], radius, step, shape)
+        total = len(lat_arr)
+        update_every = max(1, total//50)
+        if merge_places:
+            places_lat, places_lng = self.places_anchors(lat_arr, lng_arr, rows, cols)
+        else:
+            places_lat, places_lng = lat_arr, lng_arr
+        # Case-folded once per scan instead of lowercasing the name for every result
+        needle = business.casefold()
+        done = 0
+        found = dict.fromkeys(RANK_COLS, 0)  # Running ranked-point counts shown while the scan runs
+        last_update, last_done = 0.0, 0
+        
+        # Columnar result buffers filled by grid index; -1 marks "not ranked"
+        ranks = {col: np.full(total, -1, dtype=np.int16) for col in RANK_COLS}
+        locations = np.empty(total, dtype=object)
+        all_competitors = [None] * total
+        
+        self._lookups = {}
+        self._refresh = refresh  # Re-query SERP ranks; fresh answers still overwrite the disk cache
+        # Concurrency cap and token bucket per SERP provider, so a slow provider can't starve
+        # the other; 429s pause the provider's bucket instead of one request
+        self._limits = {api: RateLimiter(serp_rate, serp_concurrency) for api in ('serpstack', 'scraperapi')}
+        
+        async def track(i, lat, lng, places_at):
+            nonlocal done, last_update, last_done
+            lp, org, gmp, location_str, top_competitors = await self._scan_point(
+                http, lat, lng, places_at, business, domain, needle)
+            for col, rank in zip(RANK_COLS, (org, lp, gmp)):
+                if rank is not None:
+                    ranks[col][i] = rank
+                    found[col] += 1
+            locations[i] = location_str
+            all_competitors[i] = top_competitors
+            done += 1
+            # Each update is a websocket message, so cap them at ~50 per scan and 10 per second;
+            # cache-hit scans otherwise finish points faster than the browser can redraw.
+            # An update held back by the time gate goes out with the next completed point
+            if progress and (done == total or (done - last_done >= update_every
+                                               and time.monotonic() - last_update >= 0.1)):
+                last_update, last_done = time.monotonic(), done
+                progress.progress(done/total, text=f"{done}/{total} points · ranked in Local Pack "
+                                  f"{found['lp_rank']}, Organic {found['org_rank']}, Maps {found['gmp_rank']}")
+        
+        # One keep-alive pool per scan; per-host cap matches the per-provider concurrency.
+        # Connectors are bound to the event loop asyncio.run creates, so they can't outlive a scan,
+        # but resolved hosts are kept for the whole scan instead of aiohttp's 10s default
+        connector = aiohttp.TCPConnector(limit=2*serp_concurrency, limit_per_host=serp_concurrency,
+                                         ttl_dns_cache=300)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as http:
+            await asyncio.gather(*(track(i, lat, lng, places_at)
+                                   for i, (lat, lng, places_at) in enumerate(zip(
+                                       lat_arr.tolist(), lng_arr.tolist(),
+                                       zip(places_lat.tolist(), places_lng.tolist())))))
+        
+        out = pd.DataFrame({
+            'keyword': pd.Categorical.from_codes(np.zeros(total, dtype=np.int8), [business]),
+            'lat': lat_arr,
+            'lng': lng_arr,
+            'dist_km': dist_arr,
+            **ranks,
+            'location': locations
+        })
+        out[RANK_COLS] = out[RANK_COLS].mask(out[RANK_COLS] == -1)
+        
+        # Competitors as one flat table; 'point' is the row index into the results
+        competitors = pd.DataFrame([spot for spots in all_competitors for spot in spots])
+        competitors.insert(0, 'point', np.repeat(np.arange(total), [len(spots) for spots in all_competitors]))
         
         self.results = out
-        self.competitors = all_competitors
-        st.session_state['center'] = center
-        st.session_state['competitors'] = analyze_competitors(all_competitors)
+        self.competitors = competitors
         return out
 
 # --- Streamlit UI ---
@@ -453,6 +757,15 @@ with st.sidebar:
     shape = st.selectbox('Grid Shape', ['Circle','Square'])
     radius = st.slider('Radius (km)', 0.5, 10.0, 2.0, 0.5)
     step = st.slider('Spacing (km)', 0.1, 2.0, 0.5, 0.1)
+    merge_places = st.checkbox('Share Maps lookups between neighbouring points', value=False,
+                               help="Points in each 2x2 block share one Maps lookup; cuts Google Places calls "
+                                    "3-4x, less on small grids where edge blocks are partial")
+    serp_rate = st.slider('SERP requests per second', 1, 20, SERP_RATE_PER_SEC,
+                          help="Per provider; match your Serpstack/ScraperAPI plan's rate limit")
+    serp_concurrency = st.slider('Concurrent SERP requests', 1, 64, SERP_CONCURRENCY,
+                                 help="Per provider; lower it if your plan rejects parallel requests")
+    refresh = st.checkbox('Bypass SERP cache', value=False,
+                          help="Re-fetch rankings instead of reusing results cached in the last day")
     
     tracker = GeoGridTracker(serp_key, gmaps_key, scraper_key) if serp_key and gmaps_key else None
     
@@ -460,21 +773,21 @@ with st.sidebar:
         if st.button('Run Scan', type="primary"):
             with st.spinner('Running scan... This may take a few minutes'):
                 prog = st.progress(0)
-                data = tracker.run_scan(business, website, radius, step, shape, prog)
-                st.session_state['data'] = data
-                df = pd.DataFrame(data)
-                
-                # Calculate visibility metrics
-                st.session_state['summary'] = {
-                    'total': len(df),
-                    'org_pct': df['org_rank'].notna().mean()*100,
-                    'org_top3': (df['org_rank'] <= 3).mean()*100 if not df['org_rank'].empty else 0,
-                    'lp_pct': df['lp_rank'].notna().mean()*100,
-                    'lp_top3': (df['lp_rank'] <= 3).mean()*100 if not df['lp_rank'].empty else 0,
-                    'gmp_pct': df['gmp_rank'].notna().mean()*100,
-                    'gmp_top3': (df['gmp_rank'] <= 3).mean()*100 if not df['gmp_rank'].empty else 0
-                }
-                st.success('Scan completed!')
+                df = tracker.run_scan(business, website, radius, step, shape, prog, merge_places, serp_rate,
+                                      serp_concurrency, refresh)
+                # A failed geocode or a grid with no points inside the radius leaves nothing to show
+                if df.empty:
+                    st.warning('No grid points were scanned. Check that the business name can be '
+                               'geocoded and that the spacing is smaller than the radius.')
+                else:
+                    st.session_state['data'] = df
+                    st.session_state['data_hash'] = results_hash(df)
+                    st.session_state['center'] = tracker.center
+                    st.session_state['competitors'] = analyze_competitors(tracker.competitors)
+                    
+                    # Calculate visibility metrics
+                    st.session_state['summary'] = summarize_visibility(df)
+                    st.success('Scan completed!')
     else:
         st.warning('Enter all required fields to run scan')
 
@@ -505,15 +818,16 @@ if 'data' in st.session_state:
     tab1, tab2, tab3, tab4 = st.tabs(['Local Pack Coverage', 'Organic Coverage', 'Maps Coverage', 'Competitor Analysis'])
     
     center = st.session_state['center']
-    df = pd.DataFrame(st.session_state['data'])
+    df = st.session_state['data']
+    data_hash = st.session_state['data_hash']
     
     with tab1:
-        fig1 = create_scattermap(df, center['lat'], center['lng'], 'lp_rank', 'Local Pack Coverage')
+        fig1 = cached_scattermap(data_hash, df, center['lat'], center['lng'], 'lp_rank', 'Local Pack Coverage')
         st.plotly_chart(fig1, use_container_width=True)
         
         # Local Pack data table
         st.subheader("Local Pack Rankings Detail")
-        lp_data = df[['location', 'dist_km', 'lp_rank']].copy()
+        lp_data = df[['location', 'dist_km', 'lp_rank']]
         lp_data.columns = ['Location', 'Distance (km)', 'Local Pack Rank']
         st.dataframe(lp_data.sort_values('Distance (km)'))
     
@@ -522,10 +836,10 @@ if 'data' in st.session_state:
         st.subheader("Organic Rankings Heatmap")
         
         # Create heatmap with improved function
-        folmap = create_organic_heatmap(st.session_state['data'], center['lat'], center['lng'])
+        folmap = cached_organic_heatmap(data_hash, df, center['lat'], center['lng'])
         
-        # Display the map
-        st_folium(folmap, key='organic_heatmap', width=700, height=500)
+        # Display the map; it is view-only, so don't send map state back and rerun on pan/zoom
+        st_folium(folmap, key='organic_heatmap', width=700, height=500, returned_objects=[])
         
         # Create metrics for organic visibility
         org_visible = df['org_rank'].notna().sum()
@@ -539,17 +853,17 @@ if 'data' in st.session_state:
     
     # Organic data table
     st.subheader("Organic Rankings Detail")
-    org_data = df[['location', 'dist_km', 'org_rank']].copy()
+    org_data = df[['location', 'dist_km', 'org_rank']]
     org_data.columns = ['Location', 'Distance (km)', 'Organic Rank']
     st.dataframe(org_data.sort_values('Organic Rank').dropna(subset=['Organic Rank']))
     
     with tab3:
-        fig3 = create_scattermap(df, center['lat'], center['lng'], 'gmp_rank', 'Google Maps Coverage')
+        fig3 = cached_scattermap(data_hash, df, center['lat'], center['lng'], 'gmp_rank', 'Google Maps Coverage')
         st.plotly_chart(fig3, use_container_width=True)
         
         # Maps data table
         st.subheader("Google Maps Rankings Detail")
-        maps_data = df[['location', 'dist_km', 'gmp_rank']].copy() 
+        maps_data = df[['location', 'dist_km', 'gmp_rank']]
         maps_data.columns = ['Location', 'Distance (km)', 'Maps Rank']
         st.dataframe(maps_data.sort_values('Distance (km)'))
     
@@ -584,7 +898,7 @@ if 'data' in st.session_state:
             fig2.add_trace(go.Bar(
                 x=top5['business_name'],
                 y=top5['avg_rating'],
-                text=top5['avg_rating'].apply(lambda x: f"{x:.1f}"),
+                texttemplate='%{y:.1f}',
                 textposition='auto',
                 marker_color='coral'
             ))
@@ -601,11 +915,14 @@ if 'data' in st.session_state:
     
     # Downloads
     st.header("Export Results")
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
-        st.download_button('Download CSV', df.to_csv(index=False), 'geo_grid_results.csv', key='csv')
+        st.download_button('Download CSV', csv_bytes(data_hash, df), 'geo_grid_results.csv', key='csv')
     with col2:
-        st.download_button('Download JSON', json.dumps(st.session_state['data']), 'geo_grid_results.json', key='json')
+        st.download_button('Download JSON', json_bytes(data_hash, df), 'geo_grid_results.json', key='json')
+    with col3:
+        st.download_button('Download Parquet', parquet_bytes(data_hash, df), 'geo_grid_results.parquet',
+                           key='parquet')
 
     # Help info
     with st.expander("How to Interpret Results"):